@@ -5,11 +5,93 @@ import io
 import os
 
 from sheet_filter import generate_exam_sheets
-from utils import df_to_bytes, normalize_subject
-from seating import generate_seating
-from qp_arrange import generate_room_pdfs, generate_summaries
+from utils import df_to_bytes, qp_codes_from_filenames, read_excel_fast
 from data_loader import load_data_by_category
-from remark_generator import generate_remark_sheets
+# seating / qp_arrange (PyPDF2) / remark_generator (openpyxl) are imported
+# inside the handlers that use them to keep cold start light.
+
+# -------------------------
+# Cached helpers
+# -------------------------
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PREVIEW_ROWS = 500
+
+ROOM_CARD_HTML = """
+<div style="
+    flex: 0 0 calc((100% - 2rem) / 3);
+    box-sizing: border-box;
+    border: 2px solid #1f77b4;
+    border-radius: 10px;
+    padding: 15px;
+    margin: 5px 0;
+    background: linear-gradient(135deg, #f0f8ff 0%, #e6f3ff 100%);
+    text-align: center;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+">
+    <h4 style="margin: 0 0 10px 0; color: #1f77b4;">🏛️ {room}</h4>
+    <p style="margin: 0; color: #666; font-size: 0.9em;">PDF Bundle Ready</p>
+</div>
+"""
+
+def file_sig(f):
+    """Stable cache key for an UploadedFile (the wrapper object changes every rerun)."""
+    return (getattr(f, "file_id", f.name), f.size)
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def _parse_table(sig, _file):
+    """Parse an uploaded CSV/Excel file once per distinct upload (cache bounded)."""
+    data = io.BytesIO(_file.getvalue())
+    if _file.name.endswith(".csv"):
+        return pd.read_csv(data)
+    return read_excel_fast(data)
+
+@st.cache_data(show_spinner=False)
+def _room_index(room_df):
+    """Index Start/End bench numbers by room (first row wins, as before).
+
+    Rooms with a blank Start/End are left out rather than failing the cast;
+    Tab 2 warns when one of them is selected.
+    """
+    rooms = room_df.drop_duplicates("Room").set_index("Room")[["Start", "End"]]
+    return rooms.dropna(subset=["Start", "End"]).astype(int)
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def _run_seating_pipeline(room_df, students_df, selected_rooms, selected_day):
+    """Seating + summaries, memoized on input contents so re-clicking Generate is free."""
+    from seating import generate_seating
+    from qp_arrange import generate_summaries
+
+    selected_rooms = list(selected_rooms)
+    seating_df, final_df = generate_seating(room_df, students_df, selected_rooms, selected_day)
+    summaries = generate_summaries(seating_df, selected_rooms)
+    return (seating_df, final_df) + tuple(summaries)
+
+@st.cache_data(show_spinner=False)
+def _capacity(room_df, selected):
+    """Total seats (3 per bench) across the selected rooms."""
+    sel = _room_index(room_df).reindex(list(selected))
+    return int(((sel["End"] - sel["Start"] + 1) * 3).sum())
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def _xlsx_bytes(df):
+    """xlsx bytes for a DataFrame, cached (bounded) per result set."""
+    return df_to_bytes(df)
+
+def _download_xlsx(label, df, file_name):
+    """Download button whose xlsx is only written when it is clicked."""
+    st.download_button(label, lambda: _xlsx_bytes(df), file_name, mime=XLSX_MIME)
+
+def _preview(df):
+    """On-screen table capped at PREVIEW_ROWS; downloads always carry the full frame."""
+    view = df.head(PREVIEW_ROWS).copy()
+    # Room DBs mix numbers and names (101 next to LAB), which Arrow can't convert
+    # in a categorical/object column; show those as text, blanks left blank
+    for col in view.columns:
+        if isinstance(view[col].dtype, pd.CategoricalDtype) or view[col].dtype == object:
+            view[col] = view[col].astype(str).where(view[col].notna())
+    st.dataframe(view, width='stretch')
+    if len(df) > PREVIEW_ROWS:
+        st.caption(f"Showing first {PREVIEW_ROWS} of {len(df)} rows — download for the full view.")
 
 # -------------------------
 # Page setup
@@ -23,6 +105,7 @@ st.title("🎓 SeatMaster")
 default_keys = {
     # static data
     "room_df": None,
+    "room_choices": None,     # room names in sheet order, set with room_df
     "mapping_df": None,
     "template_path": None,
     "student_map_df": None,   # permanent student mapping
@@ -30,41 +113,42 @@ default_keys = {
 
     # dynamic exam data
     "exam_students_df": None,
+    "day_cols": None,
     "qp_file_objs": None,
-    "selected_rooms": None,
-    "selected_day": None,
 
     # outputs
-    "final_df_bytes": None,
-    "detailed_seating_bytes": None,
-    "room_summary_bytes": None,
-    "qp_summary_bytes": None,
-    "qp_count_bytes": None,
-    "hall_qp_summary_bytes": None,
+    "final_df_raw": None,
+    "seating_df": None,
+    "room_summary_raw": None,
+    "qp_summary_raw": None,
+    "qp_count_raw": None,
+    "hall_qp_summary_raw": None,
     "room_pdfs": None,
     "generated_seating": False,
     "generated_qp": False
 }
-for k, v in default_keys.items():
-    if k not in st.session_state:
-        st.session_state[k] = v
+ss = st.session_state  # bound once; reused by every tab below
+if "_initialized" not in ss:
+    ss.update({k: v for k, v in default_keys.items() if k not in ss})
+    ss["_initialized"] = True
 
 # -------------------------
 # Sidebar: UG/PG selector
 # -------------------------
 st.sidebar.markdown("### 🎯 Select Category")
 mode = st.sidebar.radio("Choose Data Type", ["UG", "PG"], index=1, horizontal=True)
-st.session_state["category"] = mode
+ss["category"] = mode
 
 # Auto-load static data
-if st.session_state.get("room_df") is None or st.session_state.get("mapping_df") is None:
+if ss.get("room_df") is None or ss.get("mapping_df") is None:
     loaded_data = load_data_by_category(mode)
-    st.session_state.update(loaded_data)
+    ss.update(loaded_data)
     st.sidebar.success(f"📂 Loaded {mode} data from /data/")
 
 if st.sidebar.button("🔄 Reload Static Data"):
+    load_data_by_category.clear()
     loaded_data = load_data_by_category(mode)
-    st.session_state.update(loaded_data)
+    ss.update(loaded_data)
     st.sidebar.info(f"✅ Reloaded static data for {mode}")
 
 # -------------------------
@@ -101,14 +185,19 @@ with tabs[0]:
     if st.button("📦 Load Exam Files into Session"):
         try:
             if exam_students_file:
-                df = pd.read_excel(exam_students_file) if exam_students_file.name.endswith(".xlsx") else pd.read_csv(exam_students_file)
-                st.session_state["exam_students_df"] = df
+                df = _parse_table(file_sig(exam_students_file), exam_students_file)
+                day_cols = df.columns[df.columns.astype(str).str.upper().str.startswith("DAY")].tolist()
+                df[day_cols] = df[day_cols].astype("category")
+                ss["exam_students_df"] = df
+                ss["day_cols"] = day_cols
                 st.success(f"✅ Loaded {len(df)} exam students.")
             if exam_qp_files:
-                qp_dict = {qp.name.rsplit(".pdf", 1)[0].upper(): qp.getvalue() for qp in exam_qp_files}
-                existing = st.session_state.get("uploaded_qps") or {}
-                existing.update(qp_dict)
-                st.session_state["uploaded_qps"] = existing
+                # keep the UploadedFile handles; generate_room_pdfs reads only the QPs it needs
+                codes = qp_codes_from_filenames([qp.name for qp in exam_qp_files])
+                # copy: the static dict is a cache_resource shared across sessions
+                existing = dict(ss.get("uploaded_qps") or {})
+                existing.update(zip(codes, exam_qp_files))
+                ss["uploaded_qps"] = existing
                 st.success(f"✅ {len(exam_qp_files)} QP PDFs loaded into session.")
         except Exception as e:
             st.error(f"Error loading exam data: {e}")
@@ -117,9 +206,9 @@ with tabs[0]:
     st.markdown("### 📊 Current Data Status")
     col1, col2, col3 = st.columns(3)
 
-    room_df = st.session_state.get("room_df")
-    exam_df = st.session_state.get("exam_students_df")
-    qp_dict = st.session_state.get("uploaded_qps")
+    room_df = ss.get("room_df")
+    exam_df = ss.get("exam_students_df")
+    qp_dict = ss.get("uploaded_qps")
 
     room_count = len(room_df) if room_df is not None else 0
     exam_count = len(exam_df) if exam_df is not None else 0
@@ -130,7 +219,7 @@ with tabs[0]:
     with col2:
         st.metric("👨‍🎓 Exam Students", exam_count)
     with col3:
-        st.metric("📑 QP PDFs in Memory", qp_count)
+        st.metric("📑 QP PDFs Available", qp_count)
 
     st.info("Permanent student mappings are auto-loaded separately for remark sheet generation. They are **not used** for seating.")
 
@@ -141,28 +230,28 @@ with tabs[1]:
     st.header("🪑 Seating Plan Generator")
     st.markdown("Uses only the **uploaded exam student file** (from Tab 1).")
 
-    room_df = st.session_state.get("room_df")
-    exam_students = st.session_state.get("exam_students_df")
+    room_df = ss.get("room_df")
+    exam_students = ss.get("exam_students_df")
 
     if room_df is None or exam_students is None or exam_students.empty:
         st.warning("Please upload the exam student file first in the 'Exam Uploads' tab.")
     else:
         st.subheader(f"📊 Total Students (for this exam): {len(exam_students)}")
 
-        rooms = room_df["Room"].unique().tolist() if "Room" in room_df.columns else []
+        rooms = ss.get("room_choices") or []
         selected_rooms = st.multiselect("Select Rooms", rooms, key="select_rooms")
-        day_cols = [c for c in exam_students.columns if c.upper().startswith("DAY")]
+        day_cols = ss.get("day_cols")
+        if day_cols is None:
+            day_cols = exam_students.columns[exam_students.columns.astype(str).str.upper().str.startswith("DAY")].tolist()
+            ss["day_cols"] = day_cols
         selected_day = st.selectbox("Select Exam Day", day_cols, key="select_day") if day_cols else None
 
-        st.session_state["selected_rooms"] = selected_rooms
-        st.session_state["selected_day"] = selected_day
-
         if selected_rooms:
-            total_capacity = sum(
-                (int(room_df[room_df["Room"] == room].iloc[0]["End"]) -
-                 int(room_df[room_df["Room"] == room].iloc[0]["Start"]) + 1) * 3
-                for room in selected_rooms
-            )
+            benched = _room_index(room_df).index
+            blank_rooms = [str(r) for r in selected_rooms if r not in benched]
+            if blank_rooms:
+                st.warning(f"⚠️ No Start/End bench numbers in Room DB for: {', '.join(blank_rooms)} — they add no seats and can't be seated.")
+            total_capacity = _capacity(room_df, tuple(selected_rooms))
             st.info(f"🪑 Total Capacity of Selected Rooms: {total_capacity}")
 
         if st.button("🚀 Generate Seating Plan", key="gen_seating"):
@@ -172,39 +261,43 @@ with tabs[1]:
                 elif "Class No" not in exam_students.columns or "Student Name" not in exam_students.columns:
                     st.error("Exam file must contain 'Class No' and 'Student Name'.")
                 else:
-                    seating_df, final_df = generate_seating(room_df, exam_students, selected_rooms, selected_day)
-                    summary_df, qp_summary_df, qp_count_df, hall_qp_summary_df = generate_summaries(seating_df, selected_rooms)
-
-                    st.session_state["final_df_bytes"] = df_to_bytes(final_df)
-                    st.session_state["detailed_seating_bytes"] = df_to_bytes(seating_df)
-                    st.session_state["room_summary_bytes"] = df_to_bytes(summary_df)
-                    st.session_state["qp_summary_bytes"] = df_to_bytes(qp_summary_df)
-                    st.session_state["qp_count_bytes"] = df_to_bytes(qp_count_df)
-                    st.session_state["hall_qp_summary_bytes"] = df_to_bytes(hall_qp_summary_df)
-                    st.session_state["qp_summary_raw"] = qp_summary_df
-                    st.session_state["seating_df"] = seating_df
-                    st.session_state["generated_seating"] = True
+                    (seating_df, final_df, summary_df, qp_summary_df,
+                     qp_count_df, hall_qp_summary_df) = _run_seating_pipeline(
+                        room_df, exam_students, tuple(selected_rooms), selected_day
+                    )
+
+                    ss["final_df_raw"] = final_df
+                    ss["seating_df"] = seating_df
+                    ss["room_summary_raw"] = summary_df
+                    ss["qp_summary_raw"] = qp_summary_df
+                    ss["qp_count_raw"] = qp_count_df
+                    ss["hall_qp_summary_raw"] = hall_qp_summary_df
+                    ss["generated_seating"] = True
                     st.success("✅ Seating plan generated successfully.")
             except Exception as e:
                 st.error(f"Error generating seating: {e}")
 
-        if st.session_state.get("generated_seating"):
+        if ss.get("generated_seating"):
             st.markdown("---")
             st.subheader("🪑 Seating Results")
             tabs2 = st.tabs(["📊 Seating Plan", "📋 Room Summary", "📄 Detailed", "📥 Downloads"])
             with tabs2[0]:
-                st.dataframe(pd.read_excel(io.BytesIO(st.session_state["final_df_bytes"])), width='stretch')
+                _preview(ss["final_df_raw"])
             with tabs2[1]:
-                st.dataframe(pd.read_excel(io.BytesIO(st.session_state["room_summary_bytes"])), width='stretch')
+                _preview(ss["room_summary_raw"])
             with tabs2[2]:
-                st.dataframe(pd.read_excel(io.BytesIO(st.session_state["detailed_seating_bytes"])), width='stretch')
+                _preview(ss["seating_df"])
             with tabs2[3]:
-                st.download_button("📊 Download Seating Plan", st.session_state["final_df_bytes"], "SeatingPlan.xlsx")
-                st.download_button("📋 Download Detailed Seating", st.session_state["detailed_seating_bytes"], "DetailedSeating.xlsx")
-                st.download_button("🏛️ Download Room Summary", st.session_state["room_summary_bytes"], "RoomSummary.xlsx")
-                st.download_button("📄 Download QP Summary", st.session_state["qp_summary_bytes"], "QP_Summary.xlsx")
-                st.download_button("🔢 Download QP Counts", st.session_state["qp_count_bytes"], "QP_Counts.xlsx")
-                st.download_button("🏛️ Download Hall QP Summary", st.session_state["hall_qp_summary_bytes"], "Hall_QP_Summary.xlsx")
+                downloads = [
+                    ("📊 Download Seating Plan", "final_df_raw", "SeatingPlan.xlsx"),
+                    ("📋 Download Detailed Seating", "seating_df", "DetailedSeating.xlsx"),
+                    ("🏛️ Download Room Summary", "room_summary_raw", "RoomSummary.xlsx"),
+                    ("📄 Download QP Summary", "qp_summary_raw", "QP_Summary.xlsx"),
+                    ("🔢 Download QP Counts", "qp_count_raw", "QP_Counts.xlsx"),
+                    ("🏛️ Download Hall QP Summary", "hall_qp_summary_raw", "Hall_QP_Summary.xlsx"),
+                ]
+                for label, key, file_name in downloads:
+                    _download_xlsx(label, ss[key], file_name)
 
 # -------------------------
 # Tab 3: QP Arrangement
@@ -213,37 +306,31 @@ with tabs[2]:
     st.header(f"📄 QP Arrangement & PDF Generation ({mode})")
     st.markdown("Create room-specific question paper bundles using subject mappings and uploaded QP PDFs.")
 
-    mapping_df = st.session_state.get("mapping_df")
-    uploaded_qps = st.session_state.get("uploaded_qps") or {}
+    mapping_df = ss.get("mapping_df")
+    uploaded_qps = ss.get("uploaded_qps") or {}
 
-    if not st.session_state.get("generated_seating"):
+    if not ss.get("generated_seating"):
         st.info("Please generate seating first.")
     else:
         summary_tabs = st.tabs(["🏛️ Room Summary", "📄 QP Details"])
         with summary_tabs[0]:
             st.markdown("**Overview of subjects by room:**")
-            st.dataframe(pd.read_excel(io.BytesIO(st.session_state["room_summary_bytes"])), width='stretch')
+            _preview(ss["room_summary_raw"])
         with summary_tabs[1]:
             st.markdown("**Detailed question paper requirements:**")
-            st.dataframe(pd.read_excel(io.BytesIO(st.session_state["qp_summary_bytes"])), width='stretch')
-
-        # --- Normalize QP mapping before generation ---
-        if mapping_df is not None:
-            if "QP Code" in mapping_df.columns:
-                mapping_df["QP Code"] = mapping_df["QP Code"].astype(str).str.upper().str.strip()
-            if "Subject Name" in mapping_df.columns:
-                mapping_df["Subject Name"] = mapping_df["Subject Name"].apply(normalize_subject)
-            st.session_state["mapping_df"] = mapping_df
+            _preview(ss["qp_summary_raw"])
 
         st.markdown("---")
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🚀 Generate Room-wise QP PDFs", key="gen_qp_pdfs", use_container_width=True):
                 try:
-                    ordered_rooms = st.session_state.get("selected_rooms") or []
-                    qp_summary_df = st.session_state.get("qp_summary_raw", pd.DataFrame())
+                    ordered_rooms = ss.get("select_rooms") or []
+                    qp_summary_df = ss.get("qp_summary_raw", pd.DataFrame())
+
+                    from qp_arrange import generate_room_pdfs
 
-                    # Generate PDFs
+                    # Generate PDFs (room bundles are merged on a thread pool inside)
                     room_pdfs, room_qp_summary_df = generate_room_pdfs(
                         mapping_df,
                         qp_summary_df,
@@ -251,9 +338,9 @@ with tabs[2]:
                         ordered_rooms
                     )
 
-                    st.session_state["room_pdfs"] = room_pdfs
-                    st.session_state["room_qp_summary_df"] = room_qp_summary_df
-                    st.session_state["generated_qp"] = len(room_pdfs) > 0
+                    ss["room_pdfs"] = room_pdfs
+                    ss["room_qp_summary_df"] = room_qp_summary_df
+                    ss["generated_qp"] = len(room_pdfs) > 0
 
                     if len(room_pdfs) > 0:
                         st.success(f"✅ Room-wise QP PDFs generated successfully! ({len(room_pdfs)} rooms)")
@@ -281,57 +368,43 @@ with tabs[2]:
         # -------------------------
         # Styled Room-wise QP Download Section
         # -------------------------
-        if st.session_state.get("room_pdfs"):
+        room_pdfs = ss.get("room_pdfs")
+        if room_pdfs:
             st.markdown("---")
             st.subheader(f"📄 Generated Room PDFs ({mode})")
             st.markdown("**Download individual room QP bundles:**")
 
-            num_rooms = len(st.session_state["room_pdfs"])
+            num_rooms = len(room_pdfs)
             cols_per_row = 3
-            room_items = list(st.session_state["room_pdfs"].items())
+            room_items = list(room_pdfs.items())
 
             for i in range(0, num_rooms, cols_per_row):
+                row_items = room_items[i:i + cols_per_row]
+                # one markdown element per row of cards instead of one per room
+                cards = "".join(ROOM_CARD_HTML.format(room=room) for room, _ in row_items)
+                st.markdown(f'<div style="display: flex; gap: 1rem;">{cards}</div>', unsafe_allow_html=True)
+
                 cols = st.columns(cols_per_row)
-                for j, col in enumerate(cols):
-                    if i + j < num_rooms:
-                        room, pdf_bytes = room_items[i + j]
-                        with col:
-                            with st.container():
-                                st.markdown(f"""
-                                <div style="
-                                    border: 2px solid #1f77b4;
-                                    border-radius: 10px;
-                                    padding: 15px;
-                                    margin: 5px 0;
-                                    background: linear-gradient(135deg, #f0f8ff 0%, #e6f3ff 100%);
-                                    text-align: center;
-                                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                                ">
-                                    <h4 style="margin: 0 0 10px 0; color: #1f77b4;">🏛️ {room}</h4>
-                                    <p style="margin: 0; color: #666; font-size: 0.9em;">
-                                        PDF Bundle Ready
-                                    </p>
-                                </div>
-                                """, unsafe_allow_html=True)
-
-                                st.download_button(
-                                    label=f"📥 Download {room} QPs",
-                                    data=pdf_bytes,
-                                    file_name=f"{mode}_{room}_QPs.pdf",
-                                    mime="application/pdf",
-                                    key=f"dl_tab3_room_pdf_{i+j}",
-                                    use_container_width=True
-                                )
+                for j, (room, pdf_bytes) in enumerate(row_items):
+                    with cols[j]:
+                        st.download_button(
+                            label=f"📥 Download {room} QPs",
+                            data=lambda pdf_bytes=pdf_bytes: pdf_bytes,
+                            file_name=f"{mode}_{room}_QPs.pdf",
+                            mime="application/pdf",
+                            key=f"dl_tab3_room_pdf_{i+j}",
+                            use_container_width=True
+                        )
 
             st.markdown("---")
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("📊 Total Rooms", len(st.session_state["room_pdfs"]))
+                st.metric("📊 Total Rooms", num_rooms)
             with col2:
+                room_qp_summary_df = ss.get("room_qp_summary_df")
                 total_qps = (
-                    st.session_state["room_qp_summary_df"]["Students"].sum()
-                    if st.session_state.get("room_qp_summary_df") is not None
-                    and "Students" in st.session_state["room_qp_summary_df"].columns
+                    room_qp_summary_df["Students"].sum()
+                    if room_qp_summary_df is not None and "Students" in room_qp_summary_df.columns
                     else 0
                 )
                 st.metric("📄 Total QP Copies", total_qps)
@@ -351,14 +424,16 @@ with tabs[3]:
     exam_date = st.text_input("Enter Exam Date (e.g. 29/09/2025)")
 
     if st.button("Generate Remark Sheets", key="generate_remarks"):
-        if "seating_df" not in st.session_state or st.session_state["seating_df"] is None:
+        if "seating_df" not in ss or ss["seating_df"] is None:
             st.error("⚠️ Seating data missing. Please generate seating first.")
         else:
             try:
-                seating_df = st.session_state["seating_df"]
-                template_path = st.session_state.get("template_path") or "data/templates/template.xlsx"
+                seating_df = ss["seating_df"]
+                template_path = ss.get("template_path") or "data/templates/template.xlsx"
                 output_path = f"output/remarks_filled_{exam_title.replace(' ', '_')}.xlsx"
 
+                from remark_generator import generate_remark_sheets
+
                 result_path = generate_remark_sheets(seating_df, exam_title, exam_date, template_path, output_path)
 
                 st.success(f"✅ Remark sheets generated successfully for {len(seating_df['Room'].unique())} rooms.")
@@ -380,10 +455,10 @@ st.sidebar.markdown("""
 """)
 
 st.sidebar.markdown("### ✅ Progress Tracker")
-upload_status = "✅" if st.session_state.get("room_df") is not None else "⏳"
-exam_status = "✅" if st.session_state.get("exam_students_df") is not None else "⏳"
-seating_status = "✅" if st.session_state.get("generated_seating") else "⏳"
-qp_status = "✅" if st.session_state.get("generated_qp") else "⏳"
+upload_status = "✅" if ss.get("room_df") is not None else "⏳"
+exam_status = "✅" if ss.get("exam_students_df") is not None else "⏳"
+seating_status = "✅" if ss.get("generated_seating") else "⏳"
+qp_status = "✅" if ss.get("generated_qp") else "⏳"
 st.sidebar.markdown(f"""
 - {upload_status} Static Data Loaded  
 - {exam_status} Exam Data Uploaded  
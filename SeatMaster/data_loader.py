@@ -1,43 +1,66 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import streamlit as st
+from utils import normalize_subject_series, qp_code_from_filename, read_excel_fast
 
-def load_data_by_category(category: str):
-    """
-    Loads all static data (rooms, student mapping, QP mappings, templates, PDFs)
-    from the /data/ folder based on UG/PG selection.
+def _find_sheet(path):
+    """Prefer a pre-converted .parquet sibling (see tools/convert_static_to_parquet.py).
+
+    The parquet copy is skipped when the source sheet was modified after it, so an
+    edited sheet is never shadowed by a stale conversion.
     """
-    base_dir = os.path.join(os.getcwd(), "data")
-    result = {
-        "room_df": None,
-        "mapping_df": None,
-        "template_path": None,
-        "student_map_df": None,
-        "uploaded_qps": {}
-    }
+    parquet_path = os.path.splitext(path)[0] + ".parquet"
+    if not os.path.exists(parquet_path):
+        return path
+    if os.path.exists(path) and os.path.getmtime(parquet_path) < os.path.getmtime(path):
+        return path
+    return parquet_path
+
+def _read_sheet(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, engine="pyarrow")
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return read_excel_fast(path)
 
+def _load_rooms(base_dir, result):
     # 1️⃣ Load Room DB
     try:
-        room_path = os.path.join(base_dir, "rooms", "Room_DB.xlsx")
+        room_path = _find_sheet(os.path.join(base_dir, "rooms", "Room_DB.xlsx"))
         if os.path.exists(room_path):
-            result["room_df"] = pd.read_excel(room_path)
+            room_df = _read_sheet(room_path)
+            if "Room" in room_df.columns:
+                # categories keep the sheet order so the room picker is unchanged
+                room_df["Room"] = room_df["Room"].astype(pd.CategoricalDtype(room_df["Room"].dropna().unique()))
+                result["room_choices"] = room_df["Room"].cat.categories.tolist()
+            result["room_df"] = room_df
     except Exception as e:
         print(f"[Warning] Room DB load failed: {e}")
 
+def _read_student_file(path):
+    df = _read_sheet(_find_sheet(path))
+    df["Source File"] = os.path.basename(path)  # to identify which batch/class
+    return df
+
+def _load_student_map(base_dir, result):
     # 2️⃣ Load Student Mapping (All classes)
     try:
         student_dir = os.path.join(base_dir, "students")
-        mapping_frames = []
-        for f in os.listdir(student_dir):
-            if f.lower().endswith((".xlsx", ".csv")):
-                path = os.path.join(student_dir, f)
-                df = pd.read_excel(path) if f.endswith(".xlsx") else pd.read_csv(path)
-                df["Source File"] = f  # to identify which batch/class
-                mapping_frames.append(df)
+        paths = [
+            os.path.join(student_dir, f)
+            for f in os.listdir(student_dir)
+            if f.lower().endswith((".xlsx", ".csv"))
+        ]
+        # One class file per thread; listdir order is kept so the concat is unchanged
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as ex:
+            mapping_frames = list(ex.map(_read_student_file, paths))
         if mapping_frames:
             result["student_map_df"] = pd.concat(mapping_frames, ignore_index=True)
     except Exception as e:
         print(f"[Warning] Student mapping load failed: {e}")
 
+def _load_qp_mapping(base_dir, category, result):
     # 3️⃣ Load QP Mapping (UG/PG)
     try:
         map_dir = os.path.join(base_dir, "mapping")
@@ -46,13 +69,49 @@ def load_data_by_category(category: str):
         else:
              map_file = "UG Course Code.xlsx"     # <-- your actual UG mapping filename
 
-        map_path = os.path.join(map_dir, map_file)
+        map_path = _find_sheet(os.path.join(map_dir, map_file))
         if os.path.exists(map_path):
-            result["mapping_df"] = pd.read_excel(map_path)
-            result["mapping_df"]['QP Code'] = result["mapping_df"]['QP Code'].astype(str).str.upper().str.strip()
+            mapping_df = _read_sheet(map_path)
+            # normalized once here so QP generation can match subjects/codes directly
+            if "QP Code" in mapping_df.columns:
+                codes = mapping_df["QP Code"]
+                if not map_path.endswith(".parquet"):  # the Parquet copy stores them normalized
+                    codes = codes.astype(str).str.upper().str.strip()
+                mapping_df["QP Code"] = codes.astype("category")
+            if "Subject Name" in mapping_df.columns:
+                mapping_df["Subject Name"] = normalize_subject_series(mapping_df["Subject Name"]).astype("category")
+            result["mapping_df"] = mapping_df
     except Exception as e:
         print(f"[Warning] QP mapping load failed: {e}")
 
+@st.cache_resource(show_spinner=False)
+def load_data_by_category(category: str):
+    """
+    Loads all static data (rooms, student mapping, QP mappings, templates, PDFs)
+    from the /data/ folder based on UG/PG selection.
+
+    Cached per category and shared across sessions: callers must not mutate
+    the returned objects. Call load_data_by_category.clear() to re-read disk.
+    """
+    return _load_data_impl(category)
+
+def _load_data_impl(category):
+    base_dir = os.path.join(os.getcwd(), "data")
+    result = {
+        "room_df": None,
+        "room_choices": [],
+        "mapping_df": None,
+        "template_path": None,
+        "student_map_df": None,
+        "uploaded_qps": {}
+    }
+
+    # 1️⃣-3️⃣ Rooms, student mapping and QP mapping are independent sheets; parse them concurrently
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        ex.submit(_load_rooms, base_dir, result)
+        ex.submit(_load_student_map, base_dir, result)
+        ex.submit(_load_qp_mapping, base_dir, category, result)
+
     # 4️⃣ Load Templates
     try:
         template_path = os.path.join(base_dir, "templates", "remarks_sheet.xlsx")
@@ -79,9 +138,9 @@ def load_data_by_category(category: str):
             if os.path.exists(path):
                 for f in os.listdir(path):
                     if f.lower().endswith(".pdf"):
-                        code = f.rsplit(".pdf", 1)[0].upper().strip()
-                        with open(os.path.join(path, f), "rb") as fp:
-                            result["uploaded_qps"][code] = fp.read()
+                        code = qp_code_from_filename(f)
+                        # keep only the path; PdfReader opens it when a bundle needs it
+                        result["uploaded_qps"][code] = os.path.join(path, f)
 
         print(f"📥 Loaded QPs: {len(result['uploaded_qps'])} files")
 
@@ -1,50 +1,40 @@
 import io
-from PyPDF2 import PdfReader, PdfWriter
+import os
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import streamlit as st
-from utils import normalize_subject
+from utils import normalize_subject_series
 
 
 def generate_summaries(seating_df, ordered_rooms):
-    summary_records = []
-    qp_summary_records = []
-    all_subjects = []
-
-    for _, row in seating_df[seating_df["Subjects"] != "-"].iterrows():
-        bench, seat, room = row["Bench"], row["Seat"], row["Room"]
-        for s in str(row["Subjects"]).split(","):
-            s_norm = normalize_subject(s)
-            if s_norm:
-                qp_summary_records.append({"Room": room, "Bench": bench, "Seat": seat, "Subject": s_norm})
-                all_subjects.append(s_norm)
-
-    qp_summary_df = pd.DataFrame(qp_summary_records)
+    # One row per (seat, subject): split the comma lists and explode them
+    work = seating_df.loc[seating_df["Subjects"] != "-", ["Room", "Bench", "Seat", "Subjects"]]
+    qp_long = work.assign(Subject=work["Subjects"].astype(str).str.split(",")).explode("Subject")
+    qp_long["Subject"] = normalize_subject_series(qp_long["Subject"])
+    qp_summary_df = qp_long.loc[qp_long["Subject"] != "", ["Room", "Bench", "Seat", "Subject"]].reset_index(drop=True)
+    # few distinct rooms/subjects over many rows: group on integer codes.
+    # Room categories are rebuilt from the room values themselves (sorted by value, type
+    # kept so lookups by ordered_rooms still match), not the seating frame's selection order.
+    qp_summary_df = qp_summary_df.astype({"Room": object}).astype({"Room": "category", "Subject": "category"})
 
     # Room summary
-    for room in ordered_rooms:
-        rs = seating_df[seating_df["Room"] == room]
-        room_subjects = []
-        for subj_list in rs[rs["Subjects"] != "-"]["Subjects"]:
-            for s in str(subj_list).split(","):
-                s_norm = normalize_subject(s)
-                if s_norm:
-                    room_subjects.append(s_norm)
-        summary_records.append({
-            "Room": room,
-            "Total Students": len(rs[rs["Class No"] != "-"]),
-            "Subjects in Room": ", ".join(sorted(set(room_subjects)))
-        })
-
-    summary_df = pd.DataFrame(summary_records)
+    students_per_room = seating_df[seating_df["Class No"] != "-"].groupby("Room", observed=True, sort=False).size()
+    subjects_per_room = qp_summary_df.groupby("Room", observed=True, sort=False)["Subject"].unique()
+    summary_df = pd.DataFrame({
+        "Room": ordered_rooms,
+        "Total Students": [int(students_per_room.get(room, 0)) for room in ordered_rooms],
+        "Subjects in Room": [", ".join(sorted(subjects_per_room.get(room, []))) for room in ordered_rooms],
+    })
 
     # QP detailed counts
     if not qp_summary_df.empty:
+        bench_seat = qp_summary_df["Bench"].astype(str) + "-" + qp_summary_df["Seat"].astype(str)
         qp_count_df = (
-            qp_summary_df.groupby(["Room","Subject"])
+            qp_summary_df.assign(BenchSeat=bench_seat)
+            .groupby(["Room","Subject"], observed=True)
             .agg(
-                QP_Needed=("Subject","count"),
-                Bench_Seat_Locations=("Bench", 
-                    lambda x: ", ".join([f"{b}-{s}" for b,s in zip(x, qp_summary_df.loc[x.index,"Seat"])]))
+                QP_Needed=("Subject","size"),
+                Bench_Seat_Locations=("BenchSeat", ", ".join)
             )
             .reset_index()
             .sort_values(["Room","Subject"])
@@ -55,7 +45,7 @@ def generate_summaries(seating_df, ordered_rooms):
     # Hall summary
     if not qp_summary_df.empty:
         hall_qp_summary_df = (
-            qp_summary_df.groupby(["Room","Subject"])
+            qp_summary_df.groupby(["Room","Subject"], observed=True)
             .size()
             .reset_index(name="Total QPs Needed")
             .sort_values(["Room","Subject"])
@@ -65,33 +55,113 @@ def generate_summaries(seating_df, ordered_rooms):
 
     return summary_df, qp_summary_df, qp_count_df, hall_qp_summary_df
 
+def _qp_source(qp):
+    """QP source for the merge threads: paths and bytes as-is, uploaded files read to bytes."""
+    return qp.getvalue() if hasattr(qp, "getvalue") else qp
+
+def _open_qp(src):
+    """PdfReader for a QP given as a file path (static data) or bytes (uploads)."""
+    from PyPDF2 import PdfReader
+
+    if isinstance(src, (str, os.PathLike)):
+        return PdfReader(src)
+    return PdfReader(io.BytesIO(src))
+
+def _build_room_pdf_pikepdf(pikepdf, qp_counts):
+    out = pikepdf.Pdf.new()
+    sources = []
+    try:
+        for qp_src, count in qp_counts:
+            src = pikepdf.Pdf.open(qp_src if isinstance(qp_src, (str, os.PathLike)) else io.BytesIO(qp_src))
+            sources.append(src)
+            for _ in range(int(count)):
+                out.pages.extend(src.pages)
+
+        if len(out.pages) == 0:
+            return None
+        buf = io.BytesIO()
+        out.save(buf, linearize=False, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        return buf.getvalue()
+    finally:
+        for src in sources:
+            src.close()
+        out.close()
+
+def build_room_pdf(qp_counts):
+    """Merge `count` copies of each QP into one bundle.
+
+    `qp_counts` is a list of (pdf path or bytes, count); returns the bundle
+    bytes, or None when nothing was added. Uses pikepdf when installed,
+    PyPDF2 otherwise.
+    """
+    # One copy of one QP: the bundle is that PDF as-is, no re-encode needed
+    if len(qp_counts) == 1 and int(qp_counts[0][1]) == 1:
+        qp_src = qp_counts[0][0]
+        if isinstance(qp_src, (str, os.PathLike)):
+            with open(qp_src, "rb") as fh:
+                return fh.read()
+        return qp_src
+
+    # PDF libraries are imported here, not at module load: the seating step
+    # imports this module for generate_summaries and never touches a PDF
+    try:
+        import pikepdf  # libqpdf: appends pages by reference, much faster than PyPDF2
+    except ImportError:
+        pikepdf = None
+    if pikepdf is not None:
+        return _build_room_pdf_pikepdf(pikepdf, qp_counts)
+
+    from PyPDF2 import PdfWriter
+
+    writer = PdfWriter()
+    for qp_src, count in qp_counts:
+        reader = _open_qp(qp_src)
+        for _ in range(int(count)):
+            writer.append(reader, import_outline=False)
+
+    if len(writer.pages) == 0:
+        return None
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
 def generate_room_pdfs(mapping_df, qp_summary_df, uploaded_qps, ordered_rooms):
     room_pdfs = {}
     room_summary_rows = []
+    room_jobs = {}
+    qp_sources = {}
 
     if mapping_df is not None and not qp_summary_df.empty and uploaded_qps:
+        qp_by_room = dict(tuple(qp_summary_df.groupby("Room", observed=True, sort=False)))
+        # Subject -> QP code lookup built once; first mapping row wins on duplicates
+        first_rows = mapping_df.drop_duplicates("Subject Name")
+        subj2code = dict(zip(first_rows["Subject Name"], first_rows["QP Code"]))
         for room in ordered_rooms:
-            room_rows = qp_summary_df[qp_summary_df["Room"] == room]
-            if room_rows.empty:
+            room_rows = qp_by_room.get(room)
+            if room_rows is None or room_rows.empty:
                 continue
 
-            subject_counts = room_rows["Subject"].value_counts().to_dict()
-            writer = PdfWriter()
+            # most-needed first, ties in seating order (what value_counts gave on strings);
+            # observed=True skips subject categories absent from this room
+            subject_counts = (
+                room_rows.groupby("Subject", observed=True, sort=False).size()
+                .sort_values(ascending=False, kind="stable")
+                .to_dict()
+            )
+            qp_counts = []
 
             for subj, count in subject_counts.items():
-                matched = mapping_df[mapping_df["Subject Name"] == subj]["QP Code"].values
-                if matched.size == 0:
+                qp_code = subj2code.get(subj)
+                if qp_code is None:
                     st.warning(f"No QP code found for subject '{subj}' (room {room})")
                     continue
-                qp_code = matched[0]
                 if qp_code not in uploaded_qps:
                     st.warning(f"No uploaded PDF found for QP code '{qp_code}' (subject {subj}, room {room})")
                     continue
 
-                reader = PdfReader(io.BytesIO(uploaded_qps[qp_code]))
-                for _ in range(int(count)):
-                    for p in reader.pages:
-                        writer.add_page(p)
+                if qp_code not in qp_sources:
+                    qp_sources[qp_code] = _qp_source(uploaded_qps[qp_code])
+                qp_counts.append((qp_sources[qp_code], count))
 
                 # Add to summary
                 room_summary_rows.append({
@@ -101,11 +171,17 @@ def generate_room_pdfs(mapping_df, qp_summary_df, uploaded_qps, ordered_rooms):
                     "Students": count
                 })
 
-            if len(writer.pages) > 0:
-                out = io.BytesIO()
-                writer.write(out)
-                out.seek(0)
-                room_pdfs[room] = out.getvalue()
+            if qp_counts:
+                room_jobs[room] = qp_counts
+
+    # Each room bundle is independent, so build them concurrently. Warnings were
+    # already emitted above on the script thread (Streamlit calls aren't thread-safe).
+    if room_jobs:
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+            built = list(pool.map(build_room_pdf, room_jobs.values()))
+        for room, pdf_bytes in zip(room_jobs, built):
+            if pdf_bytes is not None:
+                room_pdfs[room] = pdf_bytes
 
     # Create summary DataFrame
     room_summary_df = pd.DataFrame(room_summary_rows)
@@ -3,6 +3,46 @@ import openpyxl
 from openpyxl.styles import Alignment, Font
 import os
 import glob
+from concurrent.futures import ThreadPoolExecutor
+
+# Template column for each seat position
+SEAT_COLUMNS = {"Left": 2, "Center": 4, "Right": 6}
+
+# students_dir -> (file signature, mapping); rebuilt only when a file is added, removed or changed
+_MAPPING_CACHE = {}
+
+def _scan_student_file(file_path):
+    """{Class_No: Batch_Name} from one student workbook (partial if the file is malformed)."""
+    found = {}
+    try:
+        # Stream the first sheet once in read-only mode: no styled cells, no DataFrame
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+
+            # 1. Scan first 15 rows to find the header row dynamically
+            class_idx = batch_idx = None
+            for _, row in zip(range(15), rows):
+                row_str = [str(val).strip() for val in row]
+                if "Class No" in row_str and "Batch Name" in row_str:
+                    class_idx = row_str.index("Class No")
+                    batch_idx = row_str.index("Batch Name")
+                    break
+
+            # 2. The same iterator continues with the data rows
+            if class_idx is not None:
+                for row in rows:
+                    c_no = row[class_idx] if class_idx < len(row) else None
+                    b_name = row[batch_idx] if batch_idx < len(row) else None
+                    if c_no is None or b_name is None:
+                        continue
+                    found[str(c_no).strip()] = str(b_name).strip()
+        finally:
+            wb.close()
+
+    except Exception as e:
+        print(f"Error processing {os.path.basename(file_path)}: {e}")
+    return found
 
 def build_student_mapping(students_dir="data/students"):
     """
@@ -15,39 +55,21 @@ def build_student_mapping(students_dir="data/students"):
         print(f"Warning: Directory '{students_dir}' not found.")
         return mapping
 
-    print(f"Scanning student files in {students_dir}...")
     files = glob.glob(os.path.join(students_dir, "*.xlsx"))
-    
-    for file_path in files:
-        try:
-            # 1. Scan first 15 rows to find the header row dynamically
-            df_scan = pd.read_excel(file_path, header=None, nrows=15)
-            
-            header_row_idx = None
-            for idx, row in df_scan.iterrows():
-                row_str = [str(val).strip() for val in row.values]
-                if "Class No" in row_str and "Batch Name" in row_str:
-                    header_row_idx = idx
-                    break
-            
-            # 2. Read file with correct header
-            if header_row_idx is not None:
-                df = pd.read_excel(file_path, header=header_row_idx)
-                # Normalize columns
-                df.columns = [str(c).strip() for c in df.columns]
-                
-                if "Class No" in df.columns and "Batch Name" in df.columns:
-                    df = df.dropna(subset=["Class No"])
-                    for _, row in df.iterrows():
-                        c_no = str(row["Class No"]).strip()
-                        b_name = str(row["Batch Name"]).strip()
-                        mapping[c_no] = b_name
-                        
-        except Exception as e:
-            print(f"Error processing {os.path.basename(file_path)}: {e}")
-            
+    sig = tuple(sorted((p, os.path.getmtime(p), os.path.getsize(p)) for p in files))
+    cached = _MAPPING_CACHE.get(students_dir)
+    if cached is not None and cached[0] == sig:
+        return dict(cached[1])
+
+    print(f"Scanning student files in {students_dir}...")
+    # Files are independent: scan them concurrently, merge in glob order (later files win)
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(files)))) as ex:
+        for found in ex.map(_scan_student_file, files):
+            mapping.update(found)
+
     print(f"Mapped {len(mapping)} students to their classes.")
-    return mapping
+    _MAPPING_CACHE[students_dir] = (sig, mapping)
+    return dict(mapping)
 
 def generate_remark_sheets(seating_df, exam_title, exam_date, template_path, output_path, students_dir="data/students"):
     """
@@ -69,7 +91,10 @@ def generate_remark_sheets(seating_df, exam_title, exam_date, template_path, out
     master_sheet = wb.active
     master_sheet.title = "Master_Template"
 
-    grouped = seating_df.groupby("Room")
+    # Class names for every seat in one pass (assign: the caller's frame is left untouched).
+    # Room goes back to its plain values so sheets stay sorted by room for categorical input.
+    class_names = seating_df['Class No'].astype(str).str.strip().map(class_map).fillna("Unknown Class")
+    grouped = seating_df.assign(Room=seating_df["Room"].astype(object), Real_Class_Name=class_names).groupby("Room")
 
     for room_name, room_data in grouped:
         ws = wb.copy_worksheet(master_sheet)
@@ -88,8 +113,7 @@ def generate_remark_sheets(seating_df, exam_title, exam_date, template_path, out
         
         # Find Footer Header Row (starts with "Class")
         footer_header_row = 25
-        for r in range(START_ROW, ws.max_row + 1):
-            val = ws.cell(row=r, column=1).value
+        for r, (val,) in enumerate(ws.iter_rows(min_row=START_ROW, max_col=1, values_only=True), start=START_ROW):
             if val and str(val).strip() == "Class":
                 footer_header_row = r
                 break
@@ -102,12 +126,17 @@ def generate_remark_sheets(seating_df, exam_title, exam_date, template_path, out
         available_rows = footer_header_row - START_ROW
         
         if needed_rows > available_rows:
-            rows_to_add = needed_rows - available_rows + 2
+            rows_to_add = int(needed_rows - available_rows + 2)
             ws.insert_rows(footer_header_row, amount=rows_to_add)
             # Update the location of the footer header because it moved down
             footer_header_row += rows_to_add 
 
         # --- Fill Seating Data ---
+        # one pass over the room instead of a mask per bench
+        bench_groups = {
+            b: list(zip(g['Seat'], g['Class No'].astype(str).str.strip()))
+            for b, g in room_data.groupby('Bench', sort=False)
+        }
         for bench_num in range(min_bench, max_bench + 1):
             current_row = START_ROW + (bench_num - min_bench)
             
@@ -116,20 +145,11 @@ def generate_remark_sheets(seating_df, exam_title, exam_date, template_path, out
             c_seat.alignment = Alignment(horizontal='center', vertical='center')
             c_seat.font = Font(bold=True)  # <--- NEW: BOLD FONT
 
-            bench_students = room_data[room_data['Bench'] == bench_num]
-            
-            for _, student in bench_students.iterrows():
-                seat_pos = student['Seat']
-                class_no = str(student['Class No']).strip()
-                
+            for seat_pos, class_no in bench_groups.get(bench_num, ()):
                 if class_no == "-" or not class_no or class_no == "nan":
                     continue
 
-                target_col = None
-                if seat_pos == "Left": target_col = 2
-                elif seat_pos == "Center": target_col = 4
-                elif seat_pos == "Right": target_col = 6
-                
+                target_col = SEAT_COLUMNS.get(seat_pos)
                 if target_col:
                     c_class = ws.cell(row=current_row, column=target_col, value=class_no)
                     c_class.alignment = Alignment(horizontal='center', vertical='center')
@@ -145,15 +165,15 @@ def generate_remark_sheets(seating_df, exam_title, exam_date, template_path, out
             header_cell.font = Font(color="FFFFFF", bold=True) # <--- NEW: WHITE TEXT
 
         # 2. Prepare Data
-        room_data['Real_Class_Name'] = room_data['Class No'].astype(str).str.strip().map(class_map).fillna("Unknown Class")
         valid_students = room_data[room_data['Class No'] != "-"]
         
         # 3. Total Students
         total_count = len(valid_students)
         # Scan slightly below the header to find "Total Students" label
-        for r in range(footer_header_row, footer_header_row + 15):
-            for c in range(1, 10):
-                val = ws.cell(row=r, column=c).value
+        scan = ws.iter_rows(min_row=footer_header_row, max_row=footer_header_row + 14,
+                            min_col=1, max_col=9, values_only=True)
+        for r, values in enumerate(scan, start=footer_header_row):
+            for c, val in enumerate(values, start=1):
                 if val and "Total Students" in str(val):
                     ws.cell(row=r, column=c+1, value=total_count)
                     break
@@ -163,21 +183,22 @@ def generate_remark_sheets(seating_df, exam_title, exam_date, template_path, out
         
         stat_row_idx = footer_header_row + 1 # Start writing below the header
         
-        for _, row in summary_stats.iterrows():
+        stat_rows = summary_stats[['Real_Class_Name', 'min', 'max', 'count']].itertuples(index=False, name=None)
+        for class_name, start_no, end_no, count in stat_rows:
             # A: Class Name
-            c1 = ws.cell(row=stat_row_idx, column=1, value=row['Real_Class_Name'])
+            c1 = ws.cell(row=stat_row_idx, column=1, value=class_name)
             c1.alignment = Alignment(horizontal='left', wrap_text=True, vertical='center')
             
             # B: Start
-            c2 = ws.cell(row=stat_row_idx, column=2, value=row['min'])
+            c2 = ws.cell(row=stat_row_idx, column=2, value=start_no)
             c2.alignment = Alignment(horizontal='center', vertical='center')
             
             # C: End
-            c3 = ws.cell(row=stat_row_idx, column=3, value=row['max'])
+            c3 = ws.cell(row=stat_row_idx, column=3, value=end_no)
             c3.alignment = Alignment(horizontal='center', vertical='center')
             
             # D: Count
-            c4 = ws.cell(row=stat_row_idx, column=4, value=row['count'])
+            c4 = ws.cell(row=stat_row_idx, column=4, value=count)
             c4.alignment = Alignment(horizontal='center', vertical='center')
             
             stat_row_idx += 1
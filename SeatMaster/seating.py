@@ -1,51 +1,45 @@
+import numpy as np
 import pandas as pd
-from utils import normalize_subject, df_to_bytes
+from utils import normalize_subject_series, df_to_bytes
 
 def generate_seating(room_df, students, selected_rooms, selected_day):
-    ordered_rooms = selected_rooms
+    ordered_rooms = list(selected_rooms)
     seats = ["Left", "Right", "Center"]
-    seating_data = []
 
     # Prepare benches per room
-    room_benches = {}
-    for room in ordered_rooms:
-        row = room_df[room_df["Room"] == room].iloc[0]
-        start, end = int(row["Start"]), int(row["End"])
-        room_benches[room] = list(range(start, end + 1))
-
-    # Interleaved seating assignment
-    for seat in seats:
-        for room in ordered_rooms:
-            for bench in room_benches[room]:
-                seating_data.append({"Room": room, "Bench": bench, "Seat": seat})
-
-    # Assign students
-    student_list = students.values.tolist()
-    student_columns = students.columns.tolist()
-    for i, slot in enumerate(seating_data):
-        if i < len(student_list):
-            row = student_list[i]
-            info = dict(zip(student_columns, row))
-            slot["Class No"] = info["Class No"]
-            slot["Student Name"] = info["Student Name"]
-            if selected_day and pd.notna(info[selected_day]):
-                raw = str(info[selected_day])
-                subjects = [normalize_subject(s) for s in raw.split(",") if str(s).strip() != ""]
-                slot["Subjects"] = ", ".join(subjects) if subjects else "-"
-            else:
-                slot["Subjects"] = "-"
-        else:
-            slot.update({"Class No": "-", "Student Name": "-", "Subjects": "-"})
-
-    seating_df = pd.DataFrame(seating_data)
-
-    # Pivot view for display
-    final_df = seating_df.pivot_table(
-        index=["Room","Bench"], 
-        columns="Seat", 
-        values="Class No", 
-        aggfunc="first"
-    ).reset_index()
+    room_idx = room_df.drop_duplicates("Room").set_index("Room")  # first row per room, as before
+    room_benches = [
+        np.arange(int(room_idx.at[room, "Start"]), int(room_idx.at[room, "End"]) + 1)
+        for room in ordered_rooms
+    ]
+
+    # Interleaved seating assignment: every room's benches for Left, then Right, then Center.
+    # Room/Seat are categoricals (built straight from integer codes) for the downstream groupbys.
+    room_codes = np.repeat(np.arange(len(ordered_rooms)), [len(b) for b in room_benches])
+    flat_benches = np.concatenate(room_benches) if room_benches else np.array([], dtype=np.int64)
+    seating_df = pd.DataFrame({
+        "Room": pd.Categorical.from_codes(np.tile(room_codes, len(seats)), categories=ordered_rooms),
+        "Bench": np.tile(flat_benches, len(seats)),
+        "Seat": pd.Categorical.from_codes(np.repeat(np.arange(len(seats)), len(flat_benches)), categories=seats),
+    })
+
+    # Assign students in order; slots past the last student stay "-"
+    n = min(len(students), len(seating_df))
+    for col in ["Class No", "Student Name"]:
+        values = np.full(len(seating_df), "-", dtype=object)
+        values[:n] = students[col].to_numpy(dtype=object)[:n]
+        seating_df[col] = values
+    subjects = np.full(len(seating_df), "-", dtype=object)
+    if selected_day and n:
+        # one row per (student, subject), normalized in bulk, then re-joined per student
+        day = students[selected_day].iloc[:n].reset_index(drop=True)
+        pieces = normalize_subject_series(day[day.notna()].astype(str).str.split(",").explode())
+        joined = pieces[pieces != ""].groupby(level=0, sort=False).agg(", ".join)
+        subjects[joined.index.to_numpy()] = joined.to_numpy(dtype=object)
+    seating_df["Subjects"] = subjects
+
+    # Pivot view for display: (Room, Bench, Seat) is unique, so a plain reshape will do
+    final_df = seating_df.set_index(["Room","Bench","Seat"])["Class No"].unstack("Seat").reset_index()
 
     display_cols = ["Room","Bench"]
     for c in ["Left","Center","Right"]:
@@ -0,0 +1,41 @@
+"""
+One-time conversion of the static /data/ sheets to Parquet.
+
+Writes a .parquet sibling next to every .xlsx/.csv in data/rooms,
+data/students and data/mapping. data_loader prefers the .parquet file when
+it is at least as new as its source sheet, which skips the Excel parse on
+cold start. Re-run after editing any of the source sheets (until then the
+edited sheet is read directly).
+
+Usage (from the SeatMaster folder):
+    python tools/convert_static_to_parquet.py
+"""
+import os
+import pandas as pd
+
+DATA_DIRS = ["rooms", "students", "mapping"]
+
+
+def convert(base_dir="data"):
+    for sub in DATA_DIRS:
+        folder = os.path.join(base_dir, sub)
+        if not os.path.isdir(folder):
+            continue
+        for f in sorted(os.listdir(folder)):
+            if not f.lower().endswith((".xlsx", ".csv")):
+                continue
+            src = os.path.join(folder, f)
+            dst = os.path.splitext(src)[0] + ".parquet"
+            try:
+                df = pd.read_csv(src) if f.lower().endswith(".csv") else pd.read_excel(src)
+                if sub == "mapping" and "QP Code" in df.columns:
+                    # persist the normalized codes; data_loader skips its string pass for .parquet
+                    df["QP Code"] = df["QP Code"].astype(str).str.upper().str.strip()
+                df.to_parquet(dst, engine="pyarrow", index=False)
+                print(f"✅ {src} -> {dst}")
+            except Exception as e:
+                print(f"[Warning] Could not convert {src}: {e}")
+
+
+if __name__ == "__main__":
+    convert()
@@ -1,9 +1,18 @@
 import io
 import pandas as pd
 
+def read_excel_fast(src, **kwargs):
+    """pd.read_excel via the Rust calamine engine, falling back to openpyxl."""
+    try:
+        return pd.read_excel(src, engine="calamine", **kwargs)
+    except Exception:
+        if hasattr(src, "seek"):
+            src.seek(0)
+        return pd.read_excel(src, engine="openpyxl", **kwargs)
+
 def df_to_bytes(df):
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
         df.to_excel(writer, index=False, sheet_name="Sheet1")
     return output.getvalue()
 
@@ -12,3 +21,15 @@ def normalize_subject(s):
     if pd.isna(s):
         return ""
     return str(s).strip().upper()
+
+def normalize_subject_series(s):
+    """Vectorized normalize_subject for a whole Series."""
+    return s.where(s.notna(), "").astype(str).str.strip().str.upper()
+
+def qp_code_from_filename(name):
+    """Return the QP code for a PDF filename (e.g. 'ab12.pdf' -> 'AB12')."""
+    return name.removesuffix(".pdf").upper().strip()
+
+def qp_codes_from_filenames(names):
+    """qp_code_from_filename over several names; returns codes in input order."""
+    return [qp_code_from_filename(n) for n in names]